@@ -0,0 +1,53 @@
+# 觸發詞查詢的微型效能測試
+# 產生 N 組假的人名/別名觸發詞，量測每則訊息的查詢時間，
+# 觸發詞從幾十個加到上萬個，每則訊息的成本應該維持平的。
+# 用法：python bench_triggers.py
+import json
+import os
+import tempfile
+import timeit
+
+from triggers import TriggerTable
+
+
+def make_table(path, n, with_contains):
+    exact = []
+    contains = []
+    for i in range(n):
+        exact.append({'keys': ['name%d' % i, 'Alias %d' % i, '別名%d' % i], 'replies': ['reply %d' % i]})
+        if with_contains:
+            contains.append({'keys': ['sub%dx' % i], 'replies': ['contains %d' % i]})
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump({'exact': exact, 'contains': contains}, f, ensure_ascii=False)
+
+
+def old_style(content, n):
+    # 原本 on_message 的寫法：每則訊息重建串列再線性 in 查詢
+    names = [['name%d' % i, 'Alias %d' % i, '別名%d' % i] for i in range(n)]
+    for name in names:
+        if content in name:
+            return True
+    return False
+
+
+def main():
+    messages = ['name7', 'ALIAS  3', '隨便聊聊的一句話，沒有觸發詞', 'lucky dog 今天吃什麼 sub5x']
+    number = 20000
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'triggers.json')
+        print('%8s %16s %16s %16s' % ('觸發詞', 'exact (us/msg)', '+contains', '舊寫法'))
+        for n in (10, 100, 1000, 10000):
+            make_table(path, n, False)
+            table = TriggerTable(path)
+            exact = timeit.timeit(lambda: [table.match(m) for m in messages], number=number)
+            make_table(path, n, True)
+            table = TriggerTable(path)
+            both = timeit.timeit(lambda: [table.match(m) for m in messages], number=number)
+            old_number = max(1, number * 10 // n)
+            old = timeit.timeit(lambda: [old_style(m, n) for m in messages], number=old_number)
+            per = number * len(messages) / 1e6
+            print('%8d %16.2f %16.2f %16.2f' % (n, exact / per, both / per, old / (old_number * len(messages) / 1e6)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+# 熱路徑效能指標
+# 記錄各事件處理器的延遲分布、計數器與快取大小，
+# 可以在程式裡用 snapshot() 取得，也可以開一個 Prometheus 文字格式的 HTTP 端點。
+import bisect
+import functools
+import time
+
+# 延遲直方圖的分桶上限（秒）
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Histogram:
+    __slots__ = ('counts', 'total', 'count')
+
+    def __init__(self):
+        # 最後一格是超過所有上限的 +Inf
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'sum': self.total,
+            'buckets': dict(zip(BUCKETS + (float('inf'),), self.counts)),
+        }
+
+
+class Metrics:
+    def __init__(self):
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+
+    def observe(self, name, seconds):
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram()
+        histogram.observe(seconds)
+
+    def inc(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge(self, name, func):
+        # func 在取 snapshot 時才呼叫，例如快取大小
+        self.gauges[name] = func
+
+    def timed(self, name):
+        # 量測 coroutine 函式的執行時間，例如事件處理器
+        def decorator(coro):
+            @functools.wraps(coro)
+            async def wrapper(*args, **kwargs):
+                start = time.perf_counter()
+                try:
+                    return await coro(*args, **kwargs)
+                except Exception:
+                    self.inc(name + '_errors')
+                    raise
+                finally:
+                    self.observe(name, time.perf_counter() - start)
+            return wrapper
+        return decorator
+
+    def snapshot(self):
+        return {
+            'histograms': {name: h.snapshot() for name, h in self.histograms.items()},
+            'counters': dict(self.counters),
+            'gauges': {name: func() for name, func in self.gauges.items()},
+        }
+
+    def prometheus(self, prefix='discordbot_'):
+        lines = []
+        for name, h in sorted(self.histograms.items()):
+            metric = prefix + name + '_seconds'
+            lines.append('# TYPE %s histogram' % metric)
+            cumulative = 0
+            for bound, count in zip(BUCKETS + (float('inf'),), h.counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append('%s_bucket{le="%s"} %d' % (metric, le, cumulative))
+            lines.append('%s_sum %r' % (metric, h.total))
+            lines.append('%s_count %d' % (metric, h.count))
+        for name, value in sorted(self.counters.items()):
+            lines.append('# TYPE %s%s_total counter' % (prefix, name))
+            lines.append('%s%s_total %d' % (prefix, name, value))
+        for name, func in sorted(self.gauges.items()):
+            lines.append('# TYPE %s%s gauge' % (prefix, name))
+            lines.append('%s%s %r' % (prefix, name, func()))
+        return '\n'.join(lines) + '\n'
+
+    async def start_http_server(self, host='127.0.0.1', port=9100):
+        # 選用的 /metrics 端點，aiohttp 是 discord.py 本來就會裝的套件
+        from aiohttp import web
+
+        async def handle(request):
+            return web.Response(text=self.prometheus(), content_type='text/plain')
+
+        app = web.Application()
+        app.router.add_get('/metrics', handle)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, host, port)
+        try:
+            await site.start()
+        except OSError:
+            await runner.cleanup()
+            raise
+        return runner
+
+
+# 整個 bot 共用的一份
+metrics = Metrics()
@@ -0,0 +1,94 @@
+# 對外訊息合併佇列
+# 同一個頻道在短時間內連續要送的訊息先放在佇列裡，
+# 到期後合併成一則（不超過 Discord 的 2000 字上限）再送出，
+# 例如「購物」原本要打五次 API，現在只要一次。
+import asyncio
+import functools
+
+# Discord 單則訊息的字數上限
+MAX_LENGTH = 2000
+
+
+class _Pending:
+    __slots__ = ('channel', 'contents', 'future', 'length', 'handle')
+
+    def __init__(self, channel, future):
+        self.channel = channel
+        self.contents = []
+        # 同一批合併的訊息共用一個 future，送出失敗時例外只會被取一次
+        self.future = future
+        self.length = 0
+        self.handle = None
+
+
+class Outbox:
+    def __init__(self, delay=0.05, limit=MAX_LENGTH, separator='\n'):
+        # delay：第一則訊息進來後最多等多久就送出（秒）
+        self.delay = delay
+        self.limit = limit
+        self.separator = separator
+        self._pending = {}
+        # 送出中的 task 要留著參照，不然可能在送完前被回收
+        self._tasks = set()
+        # 每個頻道最後一個送出中的 task，下一批要等它送完，維持先進先出
+        self._last = {}
+        # 實際送出的請求數，以及合併後省下的請求數
+        self.requests = 0
+        self.saved = 0
+
+    def send(self, channel, content):
+        # 把訊息排進頻道的佇列，回傳一個 future，送出後會得到 discord.Message
+        loop = asyncio.get_running_loop()
+        content = str(content)
+        key = channel.id
+        pending = self._pending.get(key)
+        if pending is not None and pending.length + len(self.separator) + len(content) > self.limit:
+            # 放不下了，先把目前的送出去
+            self._flush(key)
+            pending = None
+        if pending is None:
+            pending = _Pending(channel, loop.create_future())
+            self._pending[key] = pending
+            pending.handle = loop.call_later(self.delay, self._flush, key)
+        else:
+            pending.length += len(self.separator)
+        pending.contents.append(content)
+        pending.length += len(content)
+        return pending.future
+
+    async def flush(self):
+        # 立刻送出所有頻道的佇列，並等全部送完（例如關機前）
+        for key in list(self._pending):
+            self._flush(key)
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    def _flush(self, key):
+        pending = self._pending.pop(key, None)
+        if pending is None:
+            return
+        pending.handle.cancel()
+        task = asyncio.ensure_future(self._deliver(pending, self._last.get(key)))
+        self._tasks.add(task)
+        self._last[key] = task
+        task.add_done_callback(functools.partial(self._done, key))
+
+    def _done(self, key, task):
+        self._tasks.discard(task)
+        if self._last.get(key) is task:
+            del self._last[key]
+
+    async def _deliver(self, pending, previous):
+        if previous is not None:
+            # 前一批失敗的例外已經交給它自己的 future，這裡只等順序
+            await asyncio.wait([previous])
+        self.requests += 1
+        self.saved += len(pending.contents) - 1
+        try:
+            message = await pending.channel.send(self.separator.join(pending.contents))
+        except Exception as e:
+            if not pending.future.done():
+                pending.future.set_exception(e)
+        else:
+            if not pending.future.done():
+                pending.future.set_result(message)
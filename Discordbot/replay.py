@@ -0,0 +1,115 @@
+# 離線重播錄下來的 gateway 事件
+# 讀入 JSONL 格式的 DISPATCH 封包（每行一個 {"t": ..., "d": ...}），
+# 不連線 Discord，直接丟給 bot.py 裡真正的事件處理器，
+# 機器人的回覆會記錄下來，最後印出效能指標。
+# 用法：python replay.py replay_sample.jsonl [--prometheus] [--quiet]
+import argparse
+import asyncio
+import json
+import time
+
+import bot
+from metrics import metrics
+
+
+class ReplayUser:
+    def __init__(self, data):
+        self.id = int(data.get('id', 0))
+        self.name = data.get('username', '')
+        self.bot = data.get('bot', False)
+
+    def __eq__(self, other):
+        return getattr(other, 'id', None) == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+
+class ReplayChannel:
+    def __init__(self, channel_id, sent):
+        self.id = int(channel_id)
+        self._sent = sent
+
+    async def send(self, content=None, **kwargs):
+        self._sent.append((self.id, content))
+        return content
+
+
+class ReplayMessage:
+    def __init__(self, data, channels):
+        self.id = int(data.get('id', 0))
+        self.content = data.get('content', '')
+        self.author = ReplayUser(data.get('author', {}))
+        self.channel = channels(data.get('channel_id', 0))
+
+
+class ReplayMember(ReplayUser):
+    def __init__(self, data, channels):
+        super().__init__(data.get('user', {}))
+        self._channels = channels
+        self.dm_channel = None
+
+    async def create_dm(self):
+        self.dm_channel = self._channels(self.id)
+        return self.dm_channel
+
+
+async def replay(path):
+    sent = []
+    channels = {}
+
+    def get_channel(channel_id):
+        channel = channels.get(channel_id)
+        if channel is None:
+            channel = channels[channel_id] = ReplayChannel(channel_id, sent)
+        return channel
+
+    tasks = []
+    skipped = 0
+    start = time.perf_counter()
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            payload = json.loads(line)
+            event = payload.get('t')
+            data = payload.get('d') or {}
+            # 跟 Client.dispatch 一樣，每個事件開一個 task 執行
+            if event == 'MESSAGE_CREATE':
+                tasks.append(asyncio.ensure_future(bot.on_message(ReplayMessage(data, get_channel))))
+            elif event == 'GUILD_MEMBER_ADD':
+                tasks.append(asyncio.ensure_future(bot.on_member_join(ReplayMember(data, get_channel))))
+            else:
+                skipped += 1
+                metrics.inc('replay_skipped')
+                continue
+            metrics.inc('replay_events')
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    elapsed = time.perf_counter() - start
+    for result in results:
+        if isinstance(result, Exception):
+            print('處理事件時發生錯誤：', repr(result))
+    return sent, len(tasks), skipped, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='離線重播 gateway 事件到 bot.py 的事件處理器')
+    parser.add_argument('path', help='JSONL 格式的事件錄製檔')
+    parser.add_argument('--prometheus', action='store_true', help='用 Prometheus 文字格式印出指標')
+    parser.add_argument('--quiet', action='store_true', help='不印出機器人的回覆')
+    args = parser.parse_args()
+
+    sent, count, skipped, elapsed = asyncio.get_event_loop().run_until_complete(replay(args.path))
+    if not args.quiet:
+        for channel_id, content in sent:
+            print('[%d] %s' % (channel_id, content))
+    print('重播 %d 個事件（略過 %d 個），耗時 %.3f 秒，送出 %d 則訊息' % (count, skipped, elapsed, len(sent)))
+    if args.prometheus:
+        print(metrics.prometheus(), end='')
+    else:
+        print(json.dumps(metrics.snapshot(), ensure_ascii=False, indent=2, default=str))
+
+
+if __name__ == '__main__':
+    main()
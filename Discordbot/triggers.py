@@ -0,0 +1,183 @@
+# 關鍵字觸發引擎
+# 觸發詞與回覆都放在 triggers.json，啟動時只載入、正規化一次，
+# 之後每則訊息只需要一次 dict 查詢（完全相符），
+# 子字串觸發則用 Aho-Corasick 自動機掃過訊息一次，
+# 所以觸發詞再多，每則訊息的成本也不會跟著變大。
+import json
+import os
+import random
+import time
+from collections import deque
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'triggers.json')
+
+
+def normalize(text):
+    # 大小寫、前後空白、連續空白都視為相同
+    return ' '.join(text.split()).casefold()
+
+
+class Rule:
+    __slots__ = ('replies', 'send_all')
+
+    def __init__(self, replies, send_all=False):
+        self.replies = tuple(replies)
+        self.send_all = send_all
+
+    def pick(self):
+        # send_all 的規則依序送出全部回覆，否則隨機挑一句
+        if self.send_all:
+            return list(self.replies)
+        return [random.choice(self.replies)]
+
+
+def _string_list(entry, name):
+    value = entry.get(name)
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise ValueError('%s 必須是字串串列' % name)
+    return value
+
+
+def _parse_entries(data, section):
+    # 檢查檔案格式，格式錯誤一律丟 ValueError，讓重新載入時繼續用舊表
+    entries = data.get(section, [])
+    if not isinstance(entries, list):
+        raise ValueError('%s 必須是串列' % section)
+    result = []
+    for entry in entries:
+        if not isinstance(entry, dict):
+            raise ValueError('%s 裡的每一項都必須是物件' % section)
+        keys = _string_list(entry, 'keys')
+        replies = _string_list(entry, 'replies')
+        if not replies:
+            raise ValueError('replies 不能是空的')
+        send_all = entry.get('all', False)
+        if not isinstance(send_all, bool):
+            raise ValueError('all 必須是 true 或 false')
+        result.append((keys, Rule(replies, send_all)))
+    return result
+
+
+class _Automaton:
+    # Aho-Corasick：所有子字串觸發詞合成一個自動機，掃一次訊息就找出全部命中
+    def __init__(self):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [()]
+
+    def add(self, word, rule):
+        node = 0
+        for ch in word:
+            nxt = self.goto[node].get(ch)
+            if nxt is None:
+                nxt = len(self.goto)
+                self.goto[node][ch] = nxt
+                self.goto.append({})
+                self.fail.append(0)
+                self.out.append(())
+            node = nxt
+        self.out[node] += (rule,)
+
+    def build(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self.goto[node].items():
+                queue.append(nxt)
+                f = self.fail[node]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                target = self.goto[f].get(ch, 0)
+                self.fail[nxt] = target if target != nxt else 0
+                self.out[nxt] += self.out[self.fail[nxt]]
+
+    def search(self, text):
+        goto, fail, out = self.goto, self.fail, self.out
+        node = 0
+        found = []
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            for rule in out[node]:
+                if rule not in found:
+                    found.append(rule)
+        return found
+
+
+class TriggerTable:
+    # 檢查檔案是否被修改的間隔（秒），避免每則訊息都去 stat 一次
+    reload_interval = 2.0
+
+    def __init__(self, path=DEFAULT_PATH):
+        self.path = path
+        self._mtime = None
+        self._checked = 0.0
+        self.exact = {}
+        self.automaton = None
+        self.load()
+
+    def load(self):
+        with open(self.path, encoding='utf-8') as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError('觸發詞檔案的最外層必須是物件')
+        exact_entries = _parse_entries(data, 'exact')
+        contains_entries = _parse_entries(data, 'contains')
+        self._mtime = os.stat(self.path).st_mtime
+        self._checked = time.monotonic()
+        exact = {}
+        automaton = _Automaton()
+        has_contains = False
+        for keys, rule in exact_entries:
+            for key in keys:
+                rules = exact.setdefault(normalize(key), [])
+                if rule not in rules:
+                    rules.append(rule)
+        for keys, rule in contains_entries:
+            for key in keys:
+                key = normalize(key)
+                if key:
+                    automaton.add(key, rule)
+                    has_contains = True
+        automaton.build()
+        # 換表時整個替換，查詢中不會看到一半的新表
+        self.exact = {key: tuple(rules) for key, rules in exact.items()}
+        self.automaton = automaton if has_contains else None
+
+    def maybe_reload(self):
+        now = time.monotonic()
+        if now - self._checked < self.reload_interval:
+            return False
+        self._checked = now
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return False
+        if mtime == self._mtime:
+            return False
+        try:
+            self.load()
+        except (OSError, ValueError) as e:
+            # 檔案改壞了就繼續用舊表
+            print('觸發詞檔案載入失敗：', e)
+            self._mtime = mtime
+            return False
+        return True
+
+    def match(self, content):
+        # 回傳命中的規則（完全相符優先，再來是子字串）
+        self.maybe_reload()
+        text = normalize(content)
+        rules = list(self.exact.get(text, ()))
+        if self.automaton is not None:
+            for rule in self.automaton.search(text):
+                if rule not in rules:
+                    rules.append(rule)
+        return rules
+
+    def replies(self, content):
+        result = []
+        for rule in self.match(content):
+            result.extend(rule.pick())
+        return result